@@ -1,21 +1,41 @@
 """Core agent with session-scoped memory."""
 import logging
 import warnings
+from functools import lru_cache
 from typing import Dict, Optional
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.prompts import PromptTemplate
-from langchain.memory import ConversationBufferMemory
 
+from agent.memory import RingMemory
 from agent.tools import AgentTools
-from agent.prompts import get_system_prompt
+from agent.prompts import get_prompt_template
 from utils.config import settings
 
 logger = logging.getLogger(__name__)
 
 # In-memory conversation store keyed by session_id so context persists across requests
-MEMORIES: Dict[str, ConversationBufferMemory] = {}
+MEMORIES: Dict[str, RingMemory] = {}
+
+
+def clear_memory(session_id: str) -> bool:
+    """Reset a session's conversation history in place; returns False if none exists."""
+    memory = MEMORIES.get(session_id)
+    if memory is None:
+        return False
+    memory.clear()
+    return True
+
+
+@lru_cache(maxsize=256)
+def _prompt_for(wallet_address: Optional[str]) -> PromptTemplate:
+    """Build the ReAct prompt once per wallet context instead of on every turn."""
+    return PromptTemplate(
+        template=get_prompt_template(wallet_address),
+        input_variables=["input", "agent_scratchpad", "chat_history", "tools", "tool_names"]
+    )
+
 
 class WalletAgent:
     """Integrated wallet agent."""
@@ -25,10 +45,6 @@ class WalletAgent:
         self.db_service = db_service
         # Silence warnings
         warnings.filterwarnings("ignore", message="Convert_system_message_to_human will be deprecated!")
-        warnings.filterwarnings(
-            "ignore",
-            message="Please see the migration guide at: https://python.langchain.com/docs/versions/migrating_memory/",
-        )
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-2.0-flash",
             google_api_key=settings.google_api_key,
@@ -57,55 +73,21 @@ class WalletAgent:
             )
             tools = tools_instance.get_tools()
 
-            system_prompt = get_system_prompt(wallet_address)
-
-            # PromptTemplate with required ReAct variables for create_react_agent
-            template = f"""{system_prompt}
-
-TOOLS AVAILABLE:
-{{tools}}
-
-FORMAT:
-Question: the input question you must answer
-Thought: think about what to do (be specific and brief)
-Action: the action to take, must be one of [{{tool_names}}]
-Action Input: the input to the action
-Observation: the result of the action
-... (repeat Thought/Action/Action Input/Observation as needed)
-Thought: I now know the final answer
-Final Answer: the final answer to the original input question (be concise and natural)
-
-CONVERSATION HISTORY:
-{{chat_history}}
-
-USER QUERY:
-{{input}}
-
-YOUR RESPONSE:
-{{agent_scratchpad}}"""
-
-            prompt = PromptTemplate(
-                template=template,
-                input_variables=["input", "agent_scratchpad", "chat_history", "tools", "tool_names"]
-            )
+            prompt = _prompt_for(wallet_address)
 
             agent = create_react_agent(llm=self.llm, tools=tools, prompt=prompt)
 
             # Use per-session memory so previous turns are available when deciding tools
             memory = MEMORIES.get(session_id)
             if memory is None:
-                memory = ConversationBufferMemory(
-                    memory_key="chat_history",
-                    return_messages=True,
-                    output_key="output"
-                )
+                memory = RingMemory(k=settings.agent_memory_k)
                 MEMORIES[session_id] = memory
 
             agent_executor = AgentExecutor(
                 agent=agent,
                 tools=tools,
                 memory=memory,
-                verbose=True,  # Enable to see agent reasoning and tool calls
+                verbose=settings.agent_verbose,  # AGENT_VERBOSE=1 to print agent reasoning and tool calls
                 handle_parsing_errors="Check your output and make sure it conforms to the expected format!",
                 max_iterations=10,  # Reduced to prevent loops - most tasks need 2-5 iterations
                 max_execution_time=120,  # Reduced to 2 minutes for faster feedback
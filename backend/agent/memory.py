@@ -0,0 +1,36 @@
+"""Bounded conversation memory for the agent."""
+from collections import deque
+from typing import Any, Dict, List
+
+from langchain_core.memory import BaseMemory
+
+
+class RingMemory(BaseMemory):
+    """Keep only the last ``k`` (human, ai) exchanges as plain strings.
+
+    Cheaper than ConversationBufferMemory: no message objects are kept and the
+    oldest turn is evicted in O(1) once the buffer is full.
+    """
+
+    k: int = 6
+    memory_key: str = "chat_history"
+    input_key: str = "input"
+    output_key: str = "output"
+    buffer: Any = None
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.buffer = deque(maxlen=self.k)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, str]:
+        return {self.memory_key: "\n".join(f"User: {h}\nAI: {a}" for h, a in self.buffer)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        self.buffer.append((inputs.get(self.input_key, ""), outputs.get(self.output_key, "")))
+
+    def clear(self) -> None:
+        self.buffer.clear()
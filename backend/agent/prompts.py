@@ -131,20 +131,52 @@ RESPONSE STYLE:
 Remember: This is a TESTNET demo on Base Sepolia. All transactions use test tokens with no real value."""
 
 
-def get_system_prompt(wallet_address: str | None) -> str:
-    """Generate system prompt with wallet context."""
-    if wallet_address:
-        return f"""{SYSTEM_PROMPT_BASE}
 
-ACTIVE WALLET: {wallet_address}
+TOOLS_AND_FORMAT = """TOOLS AVAILABLE:
+{tools}
+
+FORMAT:
+Question: the input question you must answer
+Thought: think about what to do (be specific and brief)
+Action: the action to take, must be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (repeat Thought/Action/Action Input/Observation as needed)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question (be concise and natural)"""
+
+# Identical for every session and turn, so providers that cache prompt prefixes can reuse it
+PROMPT_PREFIX = f"""{SYSTEM_PROMPT_BASE}
+
+{TOOLS_AND_FORMAT}"""
+
+PROMPT_SUFFIX = """CONVERSATION HISTORY:
+{chat_history}
+
+USER QUERY:
+{input}
+
+YOUR RESPONSE:
+{agent_scratchpad}"""
+
+
+def get_wallet_context(wallet_address: str | None) -> str:
+    """Describe the active wallet for the current session."""
+    if wallet_address:
+        return f"""ACTIVE WALLET: {wallet_address}
 - Use this wallet for ALL operations unless explicitly instructed otherwise
 - When user says "my wallet" or "check balance", use this wallet
 """
     else:
-        return f"""{SYSTEM_PROMPT_BASE}
-
-NO ACTIVE WALLET
+        return """NO ACTIVE WALLET
 - User must create a wallet first
 - If user asks about "my wallet", inform them to create one
 """
 
+
+def get_prompt_template(wallet_address: str | None) -> str:
+    """Full ReAct template: static prefix, wallet context, then per-turn slots."""
+    return f"""{PROMPT_PREFIX}
+
+{get_wallet_context(wallet_address)}
+{PROMPT_SUFFIX}"""
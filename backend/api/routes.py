@@ -8,7 +8,7 @@ from schemas.requests import ChatRequest
 from schemas.responses import ChatResponse, WalletInfo
 from services.cdp_service import CDPService
 from services.db_service import DatabaseService
-from agent.core import WalletAgent
+from agent.core import WalletAgent, clear_memory
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +36,8 @@ async def chat(
         wallet_address = wallet.address if wallet else None
         
         logger.info(f"Active wallet before agent: {wallet_address or 'None'}")
+        # Don't hold a pooled connection while the agent waits on the LLM
+        await db_service.release_connection()
         
         agent = WalletAgent(cdp_service=cdp_service, db_service=db_service)
         
@@ -109,3 +111,8 @@ async def get_wallet(
         logger.error(f"Get wallet error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@chat_router.delete("/chat/{session_id}/memory")
+async def reset_memory(session_id: str):
+    """Forget the agent's conversation history for a session."""
+    return {"cleared": clear_memory(session_id)}
@@ -1,6 +1,9 @@
 """Database setup and session management."""
 import logging
+from sqlalchemy import Numeric, event, inspect, text
+from sqlalchemy.schema import CreateTable
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.orm import declarative_base
 from utils.config import settings
 
@@ -8,14 +11,36 @@ from utils.config import settings
 logging.getLogger("aiosqlite").setLevel(logging.WARNING)
 logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
+logger = logging.getLogger(__name__)
+
 Base = declarative_base()
 
 engine = create_async_engine(
     settings.database_url,
     echo=False,  # Disable SQL echo
-    future=True
+    future=True,
+    # Bounded pool so slow CDP/LLM awaits can't exhaust connections and stall every route
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_recycle=3600,
+    pool_pre_ping=True
 )
 
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Use WAL so reads are not blocked by a concurrent writer."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
 async_session_maker = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -23,9 +48,111 @@ async_session_maker = async_sessionmaker(
 )
 
 
+# USDC amount columns that were Numeric(20, 6) before moving to integer micro-units
+MICRO_COLUMNS = {
+    "policies": ("per_tx_max", "daily_cap"),
+    "spend_buckets": ("amount",),
+    "transactions": ("amount",),
+}
+
+
+def _has_unique_index(insp, table_name: str, index_name: str) -> bool:
+    return any(ix["name"] == index_name and ix["unique"] for ix in insp.get_indexes(table_name))
+
+
+def _dedupe_for_unique_indexes(conn):
+    """Collapse duplicate rows that would block the ON CONFLICT unique indexes."""
+    insp = inspect(conn)
+    existing = set(insp.get_table_names())
+    
+    if "policies" in existing and not _has_unique_index(insp, "policies", "ix_policies_wallet_id"):
+        # Keep the newest policy per wallet, the one get_policy used to return
+        conn.execute(text(
+            "DELETE FROM policies WHERE id NOT IN "
+            "(SELECT MAX(id) FROM policies GROUP BY wallet_id)"
+        ))
+    
+    if "spend_buckets" in existing and not _has_unique_index(insp, "spend_buckets", "ix_spend_wallet_date"):
+        # Fold each wallet's same-day buckets into the oldest one
+        conn.execute(text(
+            "UPDATE spend_buckets SET amount = (SELECT SUM(b.amount) FROM spend_buckets b "
+            "WHERE b.wallet_id = spend_buckets.wallet_id AND b.date = spend_buckets.date) "
+            "WHERE id IN (SELECT MIN(id) FROM spend_buckets GROUP BY wallet_id, date HAVING COUNT(*) > 1)"
+        ))
+        conn.execute(text(
+            "DELETE FROM spend_buckets WHERE id NOT IN "
+            "(SELECT MIN(id) FROM spend_buckets GROUP BY wallet_id, date)"
+        ))
+
+
+def _sync_indexes(conn):
+    """Create model indexes missing from existing tables, upgrading non-unique ones."""
+    insp = inspect(conn)
+    existing = set(insp.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        current = {ix["name"]: ix for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            found = current.get(index.name)
+            if found is not None and bool(found["unique"]) == bool(index.unique):
+                continue
+            if found is not None:
+                logger.info(f"Rebuilding index {index.name} as unique")
+                conn.execute(text(f'DROP INDEX "{index.name}"'))
+            index.create(conn)
+
+
+def _migrate_micro_columns(conn):
+    """Rescale legacy NUMERIC amount columns into BIGINT micro-units in place.
+    
+    create_all never alters existing tables, so without this a database from
+    before the switch would be read as 1e-6 of its stored values.
+    """
+    insp = inspect(conn)
+    existing = set(insp.get_table_names())
+    for table_name, columns in MICRO_COLUMNS.items():
+        if table_name not in existing:
+            continue
+        types = {c["name"]: c["type"] for c in insp.get_columns(table_name)}
+        legacy = [c for c in columns if isinstance(types.get(c), Numeric)]
+        if not legacy:
+            continue
+        
+        logger.info(f"Migrating {table_name} ({', '.join(legacy)}) to integer micro-units")
+        if conn.dialect.name == "postgresql":
+            for col in legacy:
+                conn.execute(text(
+                    f'ALTER TABLE "{table_name}" ALTER COLUMN "{col}" TYPE BIGINT '
+                    f'USING ROUND("{col}" * 1000000)::BIGINT'
+                ))
+            continue
+        
+        # SQLite cannot change a column type: copy out, recreate from the model, copy back
+        table = Base.metadata.tables[table_name]
+        names = [c.name for c in table.columns]
+        column_list = ", ".join(f'"{n}"' for n in names)
+        select_list = ", ".join(
+            f'CAST(ROUND("{n}" * 1000000) AS INTEGER)' if n in legacy else f'"{n}"' for n in names
+        )
+        conn.execute(text(f'CREATE TEMP TABLE "_legacy_{table_name}" AS SELECT * FROM "{table_name}"'))
+        conn.execute(text(f'DROP TABLE "{table_name}"'))
+        conn.execute(CreateTable(table))
+        conn.execute(text(
+            f'INSERT INTO "{table_name}" ({column_list}) '
+            f'SELECT {select_list} FROM "_legacy_{table_name}"'
+        ))
+        conn.execute(text(f'DROP TABLE "_legacy_{table_name}"'))
+        for index in table.indexes:
+            index.create(conn)
+
+
 async def init_db():
-    """Create all tables."""
+    """Create all tables, upgrading older schemas in place."""
     async with engine.begin() as conn:
+        await conn.run_sync(_dedupe_for_unique_indexes)
+        await conn.run_sync(_migrate_micro_columns)
+        await conn.run_sync(_sync_indexes)
         await conn.run_sync(Base.metadata.create_all)
 
 
@@ -1,11 +1,32 @@
 """Database models."""
 from datetime import datetime, date
 from decimal import Decimal
-from sqlalchemy import String, DateTime, Boolean, Numeric, Date, JSON
+from sqlalchemy import String, DateTime, Boolean, BigInteger, Date, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import TypeDecorator
 from db.database import Base
 
 
+class UsdcMicro(TypeDecorator):
+    """USDC amount stored as an integer number of micro-units (6 decimals).
+
+    Keeps SQLite columns as native integers instead of NUMERIC text while
+    still handing Decimal values to Python code.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(Decimal(str(value)).scaleb(6).to_integral_value())
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(value).scaleb(-6)
+
+
 class Session(Base):
     """User session tracking."""
     __tablename__ = "sessions"
@@ -32,10 +53,10 @@ class Policy(Base):
     __tablename__ = "policies"
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    wallet_id: Mapped[str] = mapped_column(String, index=True)
+    wallet_id: Mapped[str] = mapped_column(String, unique=True, index=True)
     enabled: Mapped[bool] = mapped_column(Boolean, default=False)
-    per_tx_max: Mapped[Decimal | None] = mapped_column(Numeric(precision=20, scale=6), nullable=True)
-    daily_cap: Mapped[Decimal | None] = mapped_column(Numeric(precision=20, scale=6), nullable=True)
+    per_tx_max: Mapped[Decimal | None] = mapped_column(UsdcMicro, nullable=True)
+    daily_cap: Mapped[Decimal | None] = mapped_column(UsdcMicro, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -43,22 +64,24 @@ class Policy(Base):
 class SpendBucket(Base):
     """Daily spending tracking."""
     __tablename__ = "spend_buckets"
+    __table_args__ = (Index("ix_spend_wallet_date", "wallet_id", "date", unique=True),)
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    wallet_id: Mapped[str] = mapped_column(String, index=True)
-    date: Mapped[date] = mapped_column(Date, index=True)
-    amount: Mapped[Decimal] = mapped_column(Numeric(precision=20, scale=6), default=Decimal("0"))
+    wallet_id: Mapped[str] = mapped_column(String)
+    date: Mapped[date] = mapped_column(Date)
+    amount: Mapped[Decimal] = mapped_column(UsdcMicro, default=Decimal("0"))
 
 
 class Transaction(Base):
     """Transaction history."""
     __tablename__ = "transactions"
+    __table_args__ = (Index("ix_transactions_wallet_created", "wallet_id", "created_at"),)
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    wallet_id: Mapped[str] = mapped_column(String, index=True)
+    wallet_id: Mapped[str] = mapped_column(String)
     tx_hash: Mapped[str] = mapped_column(String, unique=True)
     to_address: Mapped[str] = mapped_column(String)
-    amount: Mapped[Decimal] = mapped_column(Numeric(precision=20, scale=6))
+    amount: Mapped[Decimal] = mapped_column(UsdcMicro)
     asset: Mapped[str] = mapped_column(String, default="USDC")
     status: Mapped[str] = mapped_column(String, default="submitted")
     tx_metadata: Mapped[dict | None] = mapped_column(JSON, nullable=True)
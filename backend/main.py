@@ -4,35 +4,44 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.routes import chat_router
+from api.routes import chat_router, cdp_service
 from db.database import init_db, close_db
 from utils.config import settings
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+logger = logging.getLogger(__name__)
 
-# Reduce verbose logging from third-party libraries
-logging.getLogger("httpx").setLevel(logging.WARNING)
-logging.getLogger("httpcore").setLevel(logging.WARNING)
-logging.getLogger("grpc").setLevel(logging.WARNING)
-logging.getLogger("grpc._cython").setLevel(logging.WARNING)
-logging.getLogger("aiohttp_retry").setLevel(logging.WARNING)
-logging.getLogger("urllib3").setLevel(logging.WARNING)
-logging.getLogger("google").setLevel(logging.WARNING)
-logging.getLogger("langchain_google_genai").setLevel(logging.WARNING)
 
-logger = logging.getLogger(__name__)
+def configure_logging() -> None:
+    """Install the root handler once; safe to call again (e.g. under reload)."""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+    
+    # Reduce verbose logging from third-party libraries
+    for name in (
+        "httpx",
+        "httpcore",
+        "grpc",
+        "grpc._cython",
+        "aiohttp_retry",
+        "urllib3",
+        "google",
+        "langchain_google_genai",
+    ):
+        logging.getLogger(name).setLevel(logging.WARNING)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize and cleanup resources."""
+    configure_logging()
     logger.info("Starting application...")
     await init_db()
     yield
     logger.info("Shutting down application...")
+    await cdp_service.close()
     await close_db()
 
 
@@ -44,10 +53,10 @@ app = FastAPI(
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:5173", "https://agent-wallet-tawny.vercel.app"],
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
 app.include_router(chat_router, prefix="/api")
@@ -2,22 +2,50 @@
 import logging
 import asyncio
 import re
-from typing import Dict, List, Optional
-from cdp import CdpClient, parse_units
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+from cdp import CdpClient
 from cdp.evm_transaction_types import TransactionRequestEIP1559
-from eth_abi import encode as abi_encode
-from eth_utils import to_checksum_address
 
 import httpx
+import orjson
 from services.faucet_service import FaucetService
 
 from utils.config import settings
 
 ADDR_RE = re.compile(r"0x[a-fA-F0-9]{40}")
+TRANSFER_SELECTOR = "a9059cbb"  # ERC20 transfer(address,uint256)
+BALANCE_OF_SELECTOR = "70a08231"  # ERC20 balanceOf(address)
+JSON_HEADERS = {"content-type": "application/json"}
+_UPPER_NIBBLES = frozenset("89abcdef")  # EIP-55: uppercase where the hash nibble is >= 8
 
 logger = logging.getLogger(__name__)
 
 
+_keccak = None
+
+
+@lru_cache(maxsize=50_000)
+def _checksum(addr_lower: str) -> str:
+    """EIP-55 checksum, memoized: hot destinations skip the keccak on repeat calls."""
+    global _keccak
+    if _keccak is None:
+        # Deferred: eth_hash picks and loads its crypto backend on import
+        from eth_hash.auto import keccak as _keccak
+    hex_addr = addr_lower[2:]
+    digest = _keccak(hex_addr.encode("ascii")).hex()
+    return "0x" + "".join(c.upper() if d in _UPPER_NIBBLES else c for c, d in zip(hex_addr, digest))
+
+
+class RpcError(Exception):
+    """JSON-RPC failure carrying the HTTP status and the node's error payload."""
+
+    def __init__(self, status_code: int, error):
+        self.status_code = status_code
+        self.error = error
+        super().__init__(f"RPC error ({status_code}): {error}")
+
+
 class CDPService:
     """Service for interacting with Coinbase CDP."""
     
@@ -28,6 +56,16 @@ class CDPService:
             wallet_secret=settings.cdp_wallet_secret or None,
         )
         self.network = settings.network
+        # Keep-alive pool shared by all JSON-RPC calls instead of a new connection per request;
+        # HTTP/2 lets concurrent calls multiplex over one connection
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(20, connect=3),
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=3,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            ),
+        )
 
     def _rpc_url_for(self, network: Optional[str] = None) -> str:
         """Return JSON-RPC URL based on network or settings override."""
@@ -44,11 +82,11 @@ class CDPService:
         """Extract the first 0x-prefixed 40-hex address and return checksummed."""
         if not isinstance(value, str):
             return None
-        m = ADDR_RE.search(value.strip())
+        m = ADDR_RE.search(value)
         if not m:
             return None
         try:
-            return to_checksum_address(m.group(0))
+            return _checksum(m.group(0).lower())
         except Exception:
             return None
     
@@ -76,19 +114,29 @@ class CDPService:
             rpc_url = self._rpc_url_for(net)
             assets: List[Dict] = []
 
-            # Get ETH balance via RPC
+            # ETH and USDC in one JSON-RPC batch: a single round-trip for both reads
+            usdc_token = settings.usdc_contract_address or "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
+            balance_of = {"to": usdc_token, "data": "0x" + BALANCE_OF_SELECTOR + self._encode_address_32(addr)}
+            try:
+                eth_result, usdc_result = await self._rpc_batch(rpc_url, [
+                    ("eth_getBalance", [addr, "latest"]),
+                    ("eth_call", [balance_of, "latest"]),
+                ])
+            except Exception as e:
+                eth_result = usdc_result = e
+
             try:
-                eth_result = await self._rpc_call(rpc_url, "eth_getBalance", [addr, "latest"])
-                eth_wei = int(eth_result, 16)
-                eth_balance = eth_wei / 10**18
+                if isinstance(eth_result, Exception):
+                    raise eth_result
+                eth_balance = int(eth_result, 16) / 10**18
                 assets.append({"symbol": "ETH", "balance": f"{eth_balance:.18f}".rstrip("0").rstrip("."), "decimals": 18})
             except Exception as e:
                 logger.warning(f"ETH balance fetch failed: {e}")
 
-            # Get USDC balance via RPC
             try:
-                usdc_token = settings.usdc_contract_address or "0x036CbD53842c5426634e7929541eC2318f3dCF7e"
-                usdc_balance = await self._get_erc20_balance(rpc_url, addr, usdc_token)
+                if isinstance(usdc_result, Exception):
+                    raise usdc_result
+                usdc_balance = int(usdc_result, 16) / 10**6
                 assets.append({"symbol": "USDC", "balance": f"{usdc_balance:.6f}".rstrip("0").rstrip("."), "decimals": 6})
             except Exception as e:
                 logger.warning(f"USDC balance fetch failed: {e}")
@@ -109,7 +157,7 @@ class CDPService:
                         except Exception:
                             continue
             except Exception as e:
-                logger.debug(f"SDK list_token_balances skipped: {e}")
+                logger.debug("SDK list_token_balances skipped: %s", e)
 
             return {"assets": assets}
         except Exception as e:
@@ -128,8 +176,7 @@ class CDPService:
     async def _get_erc20_balance(self, rpc_url: str, address: str, token_address: str, decimals: int = 6) -> float:
         """Get ERC20 token balance (matching old implementation)."""
         # ERC20 balanceOf(address) => 0x70a08231 + 32-byte address
-        selector = "70a08231"
-        data = "0x" + selector + self._encode_address_32(address)
+        data = "0x" + BALANCE_OF_SELECTOR + self._encode_address_32(address)
         
         call_obj = {"to": token_address, "data": data}
         result = await self._rpc_call(rpc_url, "eth_call", [call_obj, "latest"])
@@ -145,13 +192,63 @@ class CDPService:
             "id": 1
         }
         
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.post(rpc_url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            if "error" in data:
-                raise Exception(f"RPC error: {data['error']}")
-            return data["result"]
+        response = await self.http.post(rpc_url, content=orjson.dumps(payload), headers=JSON_HEADERS)
+        # Parse once; nodes often return a JSON-RPC error body with 4xx/5xx statuses
+        try:
+            data = orjson.loads(response.content) if response.content else {}
+        except ValueError:
+            data = {}
+        if response.status_code >= 400 or "error" in data:
+            raise RpcError(response.status_code, data.get("error") or response.text[:200])
+        return data["result"]
+    
+    async def _rpc_batch(self, rpc_url: str, calls: List[tuple]) -> list:
+        """Send several (method, params) calls in one JSON-RPC batch POST.
+        
+        Results come back in call order; a call the node rejected is returned
+        as an RpcError in its slot so callers can handle each one separately.
+        """
+        payload = [
+            {"jsonrpc": "2.0", "method": method, "params": params, "id": i}
+            for i, (method, params) in enumerate(calls)
+        ]
+        
+        response = await self.http.post(rpc_url, content=orjson.dumps(payload), headers=JSON_HEADERS)
+        try:
+            data = orjson.loads(response.content) if response.content else None
+        except ValueError:
+            data = None
+        if response.status_code >= 400 or not isinstance(data, list):
+            error = data.get("error") if isinstance(data, dict) else response.text[:200]
+            raise RpcError(response.status_code, error)
+        
+        # Batch responses may arrive in any order
+        by_id = {item.get("id"): item for item in data}
+        results = []
+        for i in range(len(calls)):
+            item = by_id.get(i) or {"error": "missing batch response"}
+            if "error" in item:
+                results.append(RpcError(response.status_code, item["error"]))
+            else:
+                results.append(item.get("result"))
+        return results
+    
+    async def _wait_for_receipt(self, tx_hash: str, timeout: float = 120, interval: float = 2) -> Optional[Dict]:
+        """Poll eth_getTransactionReceipt until the tx is mined; None on timeout."""
+        rpc_url = self._rpc_url_for(self.network)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                receipt = await self._rpc_call(rpc_url, "eth_getTransactionReceipt", [tx_hash])
+                if receipt:
+                    return receipt
+            except Exception as e:
+                logger.debug("Receipt poll for %s failed: %s", tx_hash, e)
+            if loop.time() >= deadline:
+                logger.warning("Timed out waiting for receipt of %s", tx_hash)
+                return None
+            await asyncio.sleep(interval)
     
     async def request_faucet(
         self,
@@ -196,7 +293,7 @@ class CDPService:
                 # Fallback: external faucet endpoint if configured
                 if settings.faucet_endpoint:
                     try:
-                        faucet = FaucetService()
+                        faucet = FaucetService(client=self.http)
                         data = await faucet.request(address=addr, token=token_clean, network=self.network)
                         tx_hash = data.get("txHash") or data.get("transactionHash")
                     except Exception as e2:
@@ -205,28 +302,36 @@ class CDPService:
                 else:
                     raise
 
+            # Opt-in: the agent tools call this with wait_for_confirmation=False
             if wait_for_confirmation:
-                logger.info("Waiting for funds to arrive...")
-                initial = 0.0
-                try:
-                    bal0 = await self.get_balance(addr)
-                    for a in bal0.get("assets", []):
-                        if a.get("symbol", "").upper() == token_clean.upper():
-                            initial = float(a.get("balance", 0) or 0)
-                except Exception:
-                    pass
-                for _ in range(24):
-                    await asyncio.sleep(5)
+                if tx_hash:
+                    # One cheap receipt lookup per poll instead of full balance reads
+                    logger.info("Waiting for faucet transaction %s...", tx_hash)
+                    receipt = await self._wait_for_receipt(tx_hash)
+                    if receipt and receipt.get("status") == "0x0":
+                        logger.warning("Faucet transaction %s reverted", tx_hash)
+                else:
+                    logger.info("Waiting for funds to arrive...")
+                    initial = 0.0
                     try:
-                        bal = await self.get_balance(addr)
-                        current = 0.0
-                        for a in bal.get("assets", []):
+                        bal0 = await self.get_balance(addr)
+                        for a in bal0.get("assets", []):
                             if a.get("symbol", "").upper() == token_clean.upper():
-                                current = float(a.get("balance", 0) or 0)
-                        if current > initial:
-                            break
+                                initial = float(a.get("balance", 0) or 0)
                     except Exception:
-                        continue
+                        pass
+                    for _ in range(24):
+                        await asyncio.sleep(5)
+                        try:
+                            bal = await self.get_balance(addr)
+                            current = 0.0
+                            for a in bal.get("assets", []):
+                                if a.get("symbol", "").upper() == token_clean.upper():
+                                    current = float(a.get("balance", 0) or 0)
+                            if current > initial:
+                                break
+                        except Exception:
+                            continue
 
             return {
                 "tx_hash": tx_hash,
@@ -242,7 +347,7 @@ class CDPService:
         self,
         from_address: str,
         to_address: str,
-        amount: str,
+        amount: Union[str, float],
         network: Optional[str] = None,
         usdc_contract: Optional[str] = None,
     ) -> Dict:
@@ -253,14 +358,13 @@ class CDPService:
             if not src or not dst:
                 raise ValueError("Invalid from/to address.")
 
-            amount_base = int(parse_units(str(amount), 6))
+            # USDC has 6 decimals; rounding to the nearest micro-unit absorbs float noise
+            amount_base = round(float(amount) * 1_000_000)
 
-            selector = bytes.fromhex("a9059cbb")  # transfer(address,uint256)
-            to_addr_cs = to_checksum_address(dst)
-            data_tail = abi_encode(["address", "uint256"], [to_addr_cs, amount_base])
-            data_hex = "0x" + (selector + data_tail).hex()
+            # Fixed (address,uint256) layout: selector + two left-padded 32-byte words
+            data_hex = "0x" + TRANSFER_SELECTOR + dst[2:].lower().rjust(64, "0") + format(amount_base, "064x")
 
-            usdc_to = to_checksum_address(usdc_contract or settings.usdc_contract_address)
+            usdc_to = _checksum((usdc_contract or settings.usdc_contract_address).lower())
 
             tx = TransactionRequestEIP1559(
                 to=usdc_to,
@@ -280,6 +384,7 @@ class CDPService:
             raise
     
     async def close(self):
-        """Close client connection."""
+        """Close client connections."""
+        await self.http.aclose()
         await self.client.aclose()
 
@@ -1,9 +1,13 @@
 """Database service layer."""
 import logging
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import date, datetime
 from decimal import Decimal
 from typing import Optional
-from sqlalchemy import select, update
+from sqlalchemy import BigInteger, and_, bindparam, func, literal, select, type_coerce, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import Session as SessionModel, Wallet, Policy, SpendBucket, Transaction
@@ -11,6 +15,96 @@ from db.models import Session as SessionModel, Wallet, Policy, SpendBucket, Tran
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class WalletSnapshot:
+    """Detached, immutable copy of the wallet fields the API and agent read."""
+    wallet_id: str
+    address: str
+    network: str
+
+    @classmethod
+    def from_model(cls, wallet: Wallet) -> "WalletSnapshot":
+        return cls(wallet_id=wallet.wallet_id, address=wallet.address, network=wallet.network)
+
+
+MICRO = 1_000_000  # USDC has 6 decimals
+
+
+def _micro(value) -> int:
+    """Convert a USDC amount (float or Decimal) to integer micro-units."""
+    return round(value * MICRO)
+
+
+@dataclass(frozen=True, slots=True)
+class PolicySnapshot:
+    """Detached, immutable copy of a wallet's spending policy."""
+    wallet_id: str
+    enabled: bool
+    per_tx_max: Optional[Decimal]
+    daily_cap: Optional[Decimal]
+    # Limits in micro-units so enforcement compares plain ints
+    per_tx_max_micro: Optional[int]
+    daily_cap_micro: Optional[int]
+
+    @classmethod
+    def from_model(cls, policy: Policy) -> "PolicySnapshot":
+        return cls(
+            wallet_id=policy.wallet_id,
+            enabled=policy.enabled,
+            per_tx_max=policy.per_tx_max,
+            daily_cap=policy.daily_cap,
+            per_tx_max_micro=_micro(policy.per_tx_max) if policy.per_tx_max is not None else None,
+            daily_cap_micro=_micro(policy.daily_cap) if policy.daily_cap is not None else None,
+        )
+
+
+# Hot-path statements built once; SQLAlchemy's compiled cache and the driver's
+# prepared-statement cache then see the exact same statement on every call
+_POLICY_BY_WALLET = select(Policy).where(Policy.wallet_id == bindparam("wid"))
+_SPENT_FOR_DAY = select(SpendBucket.amount).where(
+    SpendBucket.wallet_id == bindparam("wid"), SpendBucket.date == bindparam("day")
+)
+# Raw stored micro-units, skipping the Decimal conversion of UsdcMicro
+_SPENT_MICRO_FOR_DAY = select(type_coerce(SpendBucket.amount, BigInteger)).where(
+    SpendBucket.wallet_id == bindparam("wid"), SpendBucket.date == bindparam("day")
+)
+# Policy plus today's spend in one round-trip
+_POLICY_WITH_SPENT = (
+    select(Policy, func.coalesce(type_coerce(SpendBucket.amount, BigInteger), 0))
+    .outerjoin(
+        SpendBucket,
+        and_(SpendBucket.wallet_id == Policy.wallet_id, SpendBucket.date == bindparam("day")),
+    )
+    .where(Policy.wallet_id == bindparam("wid"))
+)
+
+
+# Process-wide session -> wallet LRU; wallets never change after creation and the
+# session's active wallet only moves through create_or_update_wallet
+_WALLET_CACHE_SIZE = 10_000
+_wallet_cache: "OrderedDict[str, WalletSnapshot]" = OrderedDict()
+
+
+def _cache_wallet(session_id: str, snapshot: WalletSnapshot) -> None:
+    _wallet_cache[session_id] = snapshot
+    _wallet_cache.move_to_end(session_id)
+    if len(_wallet_cache) > _WALLET_CACHE_SIZE:
+        _wallet_cache.popitem(last=False)
+
+
+# Process-wide wallet_id -> policy LRU; policies only change through
+# create_or_update_policy, which writes the new snapshot through
+_POLICY_CACHE_SIZE = 1024
+_policy_cache: "OrderedDict[str, PolicySnapshot]" = OrderedDict()
+
+
+def _cache_policy(wallet_id: str, snapshot: PolicySnapshot) -> None:
+    _policy_cache[wallet_id] = snapshot
+    _policy_cache.move_to_end(wallet_id)
+    if len(_policy_cache) > _POLICY_CACHE_SIZE:
+        _policy_cache.popitem(last=False)
+
+
 class DatabaseService:
     def _norm_wallet_id(self, wallet_id: str) -> str:
         try:
@@ -22,6 +116,18 @@ class DatabaseService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        # Per-request cache, also remembers sessions that have no wallet yet
+        self._session_wallets: dict[str, Optional[WalletSnapshot]] = {}
+    
+    def _insert(self, model):
+        """Dialect-specific INSERT so writes can use ON CONFLICT upserts."""
+        if self.db.get_bind().dialect.name == "postgresql":
+            return pg_insert(model)
+        return sqlite_insert(model)
+    
+    async def release_connection(self) -> None:
+        """End the open read transaction so the pooled connection is returned during slow awaits."""
+        await self.db.commit()
     
     async def get_or_create_session(self, session_id: str) -> SessionModel:
         """Get or create session."""
@@ -34,21 +140,36 @@ class DatabaseService:
             session = SessionModel(session_id=session_id)
             self.db.add(session)
             await self.db.commit()
-            await self.db.refresh(session)
         
         return session
     
-    async def get_wallet_for_session(self, session_id: str) -> Optional[Wallet]:
+    async def get_wallet_for_session(self, session_id: str) -> Optional[WalletSnapshot]:
         """Get active wallet for session."""
-        session = await self.get_or_create_session(session_id)
+        if session_id in self._session_wallets:
+            return self._session_wallets[session_id]
         
-        if not session.wallet_id:
-            return None
+        cached = _wallet_cache.get(session_id)
+        if cached is not None:
+            _wallet_cache.move_to_end(session_id)
+            return cached
         
+        # Session and its active wallet in one round-trip
         result = await self.db.execute(
-            select(Wallet).where(Wallet.wallet_id == session.wallet_id)
+            select(SessionModel, Wallet)
+            .outerjoin(Wallet, Wallet.wallet_id == SessionModel.wallet_id)
+            .where(SessionModel.session_id == session_id)
         )
-        return result.scalar_one_or_none()
+        row = result.first()
+        
+        wallet = None
+        if row is None:
+            await self.get_or_create_session(session_id)
+        elif row[1] is not None:
+            wallet = WalletSnapshot.from_model(row[1])
+            _cache_wallet(session_id, wallet)
+        
+        self._session_wallets[session_id] = wallet
+        return wallet
     
     async def create_or_update_wallet(
         self,
@@ -83,7 +204,9 @@ class DatabaseService:
             )
             
             await self.db.commit()
-            await self.db.refresh(wallet)
+            snapshot = WalletSnapshot.from_model(wallet)
+            _cache_wallet(session_id, snapshot)
+            self._session_wallets[session_id] = snapshot
             
             logger.info(f"✅ Wallet {wallet_id} saved successfully for session {session_id}")
             
@@ -114,15 +237,39 @@ class DatabaseService:
         except Exception:
             return "base-sepolia"
     
-    async def get_policy(self, wallet_id: str) -> Optional[Policy]:
+    async def get_policy(self, wallet_id: str) -> Optional[PolicySnapshot]:
         """Get policy for wallet."""
         wid = self._norm_wallet_id(wallet_id)
-        result = await self.db.execute(
-            select(Policy)
-            .where(Policy.wallet_id == wid)
-            .order_by(Policy.created_at.desc())
-        )
-        return result.scalar_one_or_none()
+        cached = _policy_cache.get(wid)
+        if cached is not None:
+            _policy_cache.move_to_end(wid)
+            return cached
+        
+        result = await self.db.execute(_POLICY_BY_WALLET, {"wid": wid})
+        policy = result.scalar_one_or_none()
+        if policy is None:
+            return None
+        
+        snapshot = PolicySnapshot.from_model(policy)
+        _cache_policy(wid, snapshot)
+        return snapshot
+    
+    async def get_policy_status(self, wallet_id: str) -> tuple[Optional[PolicySnapshot], int]:
+        """Get the policy and today's spend (micro-units), joined into a single query on a cache miss."""
+        wid = self._norm_wallet_id(wallet_id)
+        cached = _policy_cache.get(wid)
+        if cached is not None:
+            _policy_cache.move_to_end(wid)
+            return cached, await self.get_daily_spent_micro(wid)
+        
+        result = await self.db.execute(_POLICY_WITH_SPENT, {"wid": wid, "day": date.today()})
+        row = result.first()
+        if row is None:
+            return None, 0
+        
+        snapshot = PolicySnapshot.from_model(row[0])
+        _cache_policy(wid, snapshot)
+        return snapshot, row[1]
     
     async def create_or_update_policy(
         self,
@@ -131,62 +278,118 @@ class DatabaseService:
         per_tx_max: float,
         daily_cap: float
     ) -> Policy:
-        """Create or update policy."""
+        """Create or update policy with a single INSERT ... ON CONFLICT DO UPDATE."""
         wid = self._norm_wallet_id(wallet_id)
-        policy = await self.get_policy(wid)
+        values = {
+            "enabled": enabled,
+            "per_tx_max": Decimal(str(per_tx_max)),
+            "daily_cap": Decimal(str(daily_cap)),
+            "updated_at": datetime.utcnow(),
+        }
+        stmt = self._insert(Policy).values(wallet_id=wid, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[Policy.wallet_id], set_=values).returning(Policy)
         
-        if policy:
-            policy.enabled = enabled
-            policy.per_tx_max = Decimal(str(per_tx_max))
-            policy.daily_cap = Decimal(str(daily_cap))
-            policy.updated_at = datetime.utcnow()
-        else:
-            policy = Policy(
-                wallet_id=wid,
-                enabled=enabled,
-                per_tx_max=Decimal(str(per_tx_max)),
-                daily_cap=Decimal(str(daily_cap))
-            )
-            self.db.add(policy)
-        
-        await self.db.commit()
-        await self.db.refresh(policy)
+        try:
+            result = await self.db.scalars(stmt, execution_options={"populate_existing": True})
+            policy = result.one()
+            await self.db.commit()
+        except Exception:
+            _policy_cache.pop(wid, None)
+            await self.db.rollback()
+            raise
         
+        _cache_policy(wid, PolicySnapshot.from_model(policy))
         return policy
     
     async def get_daily_spent(self, wallet_id: str) -> Decimal:
         """Get amount spent today."""
-        today = date.today()
         wid = self._norm_wallet_id(wallet_id)
-        result = await self.db.execute(
-            select(SpendBucket)
-            .where(SpendBucket.wallet_id == wid, SpendBucket.date == today)
-        )
-        bucket = result.scalar_one_or_none()
+        result = await self.db.execute(_SPENT_FOR_DAY, {"wid": wid, "day": date.today()})
+        spent = result.scalar_one_or_none()
         
-        return bucket.amount if bucket else Decimal("0")
+        return spent if spent is not None else Decimal("0")
+    
+    async def get_daily_spent_micro(self, wallet_id: str) -> int:
+        """Get amount spent today in integer micro-units."""
+        wid = self._norm_wallet_id(wallet_id)
+        result = await self.db.execute(_SPENT_MICRO_FOR_DAY, {"wid": wid, "day": date.today()})
+        return result.scalar_one_or_none() or 0
     
     async def record_spend(self, wallet_id: str, amount: float):
         """Record a spend."""
-        today = date.today()
-        wid = self._norm_wallet_id(wallet_id)
-        result = await self.db.execute(
-            select(SpendBucket)
-            .where(SpendBucket.wallet_id == wid, SpendBucket.date == today)
+        await self._add_spend(self._norm_wallet_id(wallet_id), amount)
+        await self.db.commit()
+    
+    async def _add_spend(self, wid: str, amount: float):
+        """Add amount to today's spend bucket without committing.
+        
+        A single INSERT ... ON CONFLICT DO UPDATE, so concurrent first spends of
+        the day cannot both insert a bucket and trip the unique index.
+        """
+        stmt = self._insert(SpendBucket).values(
+            wallet_id=wid, date=date.today(), amount=literal(_micro(amount), BigInteger())
         )
-        bucket = result.scalar_one_or_none()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SpendBucket.wallet_id, SpendBucket.date],
+            set_={"amount": type_coerce(SpendBucket.amount, BigInteger) + stmt.excluded.amount},
+        )
+        await self.db.execute(stmt)
+    
+    async def check_and_record(self, wallet_id: str, amount: float) -> Optional[date]:
+        """Atomically reserve a spend in today's bucket if the policy allows it.
         
-        if bucket:
-            bucket.amount += Decimal(str(amount))
-        else:
-            bucket = SpendBucket(
-                wallet_id=wid,
-                date=today,
-                amount=Decimal(str(amount))
+        The per-tx limit is checked in Python; the daily cap is enforced by a
+        conditional ON CONFLICT upsert, so two concurrent transfers cannot both
+        pass on the same remaining allowance. Returns the bucket date the spend
+        was reserved on (needed to release it), or None if not allowed.
+        """
+        wid = self._norm_wallet_id(wallet_id)
+        amount_micro = _micro(amount)
+        try:
+            policy = await self.get_policy(wid)
+            if (
+                not policy
+                or not policy.enabled
+                or policy.per_tx_max_micro is None
+                or policy.daily_cap_micro is None
+                or amount_micro > policy.per_tx_max_micro
+                or amount_micro > policy.daily_cap_micro
+            ):
+                return None
+            
+            day = date.today()
+            # Bind micro-units as plain integers; the column already stores them that way
+            stmt = self._insert(SpendBucket).values(
+                wallet_id=wid, date=day, amount=literal(amount_micro, BigInteger())
             )
-            self.db.add(bucket)
-        
-        await self.db.commit()
+            new_total = type_coerce(SpendBucket.amount, BigInteger) + stmt.excluded.amount
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SpendBucket.wallet_id, SpendBucket.date],
+                set_={"amount": new_total},
+                where=new_total <= literal(policy.daily_cap_micro, BigInteger()),
+            ).returning(SpendBucket.id)
+            
+            result = await self.db.execute(stmt)
+            reserved = result.first() is not None
+            await self.db.commit()
+            return day if reserved else None
+        except Exception:
+            await self.db.rollback()
+            raise
+    
+    async def release_spend(self, wallet_id: str, amount: float, day: date):
+        """Give back a reservation made by check_and_record on ``day`` when the transfer fails."""
+        wid = self._norm_wallet_id(wallet_id)
+        try:
+            await self.db.execute(
+                update(SpendBucket)
+                .where(SpendBucket.wallet_id == wid, SpendBucket.date == day)
+                .values(amount=type_coerce(SpendBucket.amount, BigInteger) - literal(_micro(amount), BigInteger()))
+            )
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
     
     async def validate_transaction(self, wallet_id: str, amount: float) -> dict:
         """
@@ -201,8 +404,8 @@ class DatabaseService:
         wid = self._norm_wallet_id(wallet_id)
         
         try:
-            # Get current policy
-            policy = await self.get_policy(wid)
+            # Get current policy and today's spend together
+            policy, spent_micro = await self.get_policy_status(wid)
             
             if not policy or not policy.enabled:
                 return {
@@ -211,27 +414,31 @@ class DatabaseService:
                     "policy_info": {"enabled": False}
                 }
             
+            # Compare in integer micro-units; floats are only for the messages
+            amount_micro = _micro(amount)
+            per_tx_max = policy.per_tx_max_micro / MICRO
+            daily_cap = policy.daily_cap_micro / MICRO
+            
             # Check per-transaction limit
-            per_tx_max = float(policy.per_tx_max)
-            if amount > per_tx_max:
+            if amount_micro > policy.per_tx_max_micro:
                 return {
                     "allowed": False,
                     "reason": f"Amount {amount} USDC exceeds per-transaction limit of {per_tx_max} USDC",
                     "policy_info": {
                         "enabled": True,
                         "per_tx_max": per_tx_max,
-                        "daily_cap": float(policy.daily_cap),
+                        "daily_cap": daily_cap,
                         "amount_requested": amount,
-                        "excess_amount": amount - per_tx_max
+                        "excess_amount": (amount_micro - policy.per_tx_max_micro) / MICRO
                     }
                 }
             
             # Check daily spending limit
-            daily_cap = float(policy.daily_cap)
-            daily_spent = float(await self.get_daily_spent(wid))
-            remaining_daily = daily_cap - daily_spent
+            remaining_micro = policy.daily_cap_micro - spent_micro
+            daily_spent = spent_micro / MICRO
+            remaining_daily = remaining_micro / MICRO
             
-            if amount > remaining_daily:
+            if amount_micro > remaining_micro:
                 return {
                     "allowed": False,
                     "reason": f"Amount {amount} USDC exceeds remaining daily limit of {remaining_daily} USDC",
@@ -242,7 +449,7 @@ class DatabaseService:
                         "daily_spent": daily_spent,
                         "remaining_daily": remaining_daily,
                         "amount_requested": amount,
-                        "excess_amount": amount - remaining_daily
+                        "excess_amount": (amount_micro - remaining_micro) / MICRO
                     }
                 }
             
@@ -287,7 +494,5 @@ class DatabaseService:
         )
         self.db.add(tx)
         await self.db.commit()
-        await self.db.refresh(tx)
         
         return tx
-
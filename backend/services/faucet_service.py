@@ -11,8 +11,10 @@ logger = logging.getLogger(__name__)
 class FaucetService:
     """Client for an external faucet endpoint that dispenses testnet funds."""
 
-    def __init__(self, endpoint: Optional[str] = None):
+    def __init__(self, endpoint: Optional[str] = None, client: Optional[httpx.AsyncClient] = None):
         self.endpoint = endpoint or settings.faucet_endpoint
+        # Optional shared connection pool (e.g. CDPService.http); owned by the caller
+        self.client = client
 
     async def request(self, *, address: str, token: str, network: Optional[str] = None) -> Dict:
         if not self.endpoint:
@@ -22,6 +24,10 @@ class FaucetService:
             "token": token,
             "network": (network or settings.network),
         }
+        if self.client is not None:
+            resp = await self.client.post(self.endpoint, json=payload, timeout=30)
+            resp.raise_for_status()
+            return resp.json()
         async with httpx.AsyncClient(timeout=30) as client:
             resp = await client.post(self.endpoint, json=payload)
             resp.raise_for_status()
@@ -27,11 +27,20 @@ class Settings(BaseSettings):
     
     # Agent (Gemini)
     google_api_key: str = ""
+    agent_memory_k: int = 6  # Number of past exchanges kept per session
+    agent_verbose: bool = False  # Print intermediate agent steps (debug only)
     
     # Explorer URLs
     basescan_testnet: str = "https://sepolia.basescan.org"
     basescan_mainnet: str = "https://basescan.org"
     
+    # CORS
+    cors_origins: list[str] = [
+        "http://localhost:3000",
+        "http://localhost:5173",
+        "https://agent-wallet-tawny.vercel.app",
+    ]
+    
     # Optional JWT
     jwt_secret: str = ""
     